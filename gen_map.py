@@ -27,6 +27,15 @@ LOCATIONS_CSV = 'cities.csv'
 # Values will be dictionaries containing 'name', 'color', and 'current' status.
 zones = {}
 
+# Number of bytes of Player.log already parsed, so each refresh only reads what was appended.
+player_log_offset = 0
+
+# The last bytes parsed and the file's inode, used to notice when the game has
+# started a new Player.log, even one that is already longer than the old offset.
+player_log_tail = b''
+player_log_ino = None
+LOG_TAIL_BYTES = 256
+
 # --- Utility Functions ---
 
 def trim(s: str) -> str:
@@ -68,34 +77,55 @@ def read_player_log():
     """
     Parses the Player.log file to find the player's current and recently visited zones.
     Updates the global 'zones' dictionary with color and current status.
+    Only the lines appended since the previous call are read.
     """
+    global player_log_offset, player_log_tail, player_log_ino
     player_log_file = os.path.join(SAVE_DIR, "Player.log")
 
     if not os.path.exists(player_log_file):
         print(f"Error: Player.log not found at {player_log_file}")
         return
 
-    # Unset the 'current' flag for all previously known zones.
-    for loc_data in zones.values():
+    # Unset the 'current' flag for all previously known zones, remembering where the
+    # player was in case no new zones have been loaded since the last read.
+    current_location = None
+    for zone_loc, loc_data in zones.items():
         if 'current' in loc_data:
             del loc_data['current']
+            loc_data['color'] = 'grey'
+            current_location = zone_loc
 
-    current_location = None
     # Regex to capture the zone coordinate from log lines indicating zone loading.
     # e.g., "INFO - Finished 'Thawing Zone 1.1.1.1.10'"
     log_pattern = re.compile(r"INFO - Finished '(?:Thawing|Building) \b.+\.(\d+\.\d+\.\d+\.\d+\.\d+)'")
 
     try:
-        with open(player_log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            # Read all lines and process them to find the last known location.
-            # This ensures we get the *most recent* location even if the log is large.
-            for line in f:
-                match = log_pattern.search(line)
-                if match:
-                    zone_loc = match.group(1)
-                    zones[zone_loc] = zones.get(zone_loc, {}) # Ensure the inner dict exists
-                    zones[zone_loc]['color'] = 'grey' # Mark as visited
-                    current_location = zone_loc # Update the last found location
+        with open(player_log_file, 'rb') as f:
+            # If the file changed, or the bytes we last parsed are no longer where we left
+            # them, the game started a new log: read it from the beginning.
+            log_ino = os.fstat(f.fileno()).st_ino
+            f.seek(max(0, player_log_offset - len(player_log_tail)))
+            if log_ino != player_log_ino or f.read(len(player_log_tail)) != player_log_tail:
+                player_log_offset = 0
+                player_log_tail = b''
+                current_location = None
+                f.seek(0)
+            player_log_ino = log_ino
+            data = f.read()
+
+        # Stop at the last complete line; a partially written one is picked up next time.
+        data = data[:data.rfind(b'\n') + 1]
+        player_log_offset += len(data)
+        player_log_tail = (player_log_tail + data)[-LOG_TAIL_BYTES:]
+
+        # Process the new lines in order so the last match is the most recent location.
+        for line in data.decode('utf-8', errors='ignore').splitlines():
+            match = log_pattern.search(line)
+            if match:
+                zone_loc = match.group(1)
+                zones[zone_loc] = zones.get(zone_loc, {}) # Ensure the inner dict exists
+                zones[zone_loc]['color'] = 'grey' # Mark as visited
+                current_location = zone_loc # Update the last found location
 
         if current_location:
             # Set the last found location as the current one (magenta).
@@ -34,13 +34,28 @@ COLOR_MAP = {
     'white': (255, 255, 255), 'black': (0, 0, 0),
 }
 GRID_BASE_COLOR = (40, 40, 40)
+OVERLAY_LOW_COLOR = (50, 120, 200)
+OVERLAY_HIGH_COLOR = (230, 120, 30)
 PARSANG_GRID_COLOR = (80, 80, 80)
 CURRENT_LOC_BORDER_COLOR = (255, 255, 0)
 
+# --- Underground Overlay Configuration ---
+SURFACE_Z = 10
+OVERLAY_MODES = ['off', 'count', 'deepest']
+
 # --- Global Data Structures ---
 zones = {}
+z_index = {}  # xy_key -> bitmask of Z-levels with zone data at that square
+populated_z_mask = 0
+overlay_values = {'count': {}, 'deepest': {}}  # Per mode: xy_key -> non-zero overlay value
+overlay_max = {'count': 1, 'deepest': 1}  # Largest overlay value in z_index, per mode
+overlay_shade_cache = {}
 current_location_str = "None"
 current_z_level = 10
+player_log_offset = 0  # Bytes of Player.log already parsed
+player_log_tail = b''  # Last bytes parsed, to spot a log replaced by a new session
+player_log_ino = None
+LOG_TAIL_BYTES = 256
 
 # --- Utility & Core Logic Functions (Unchanged) ---
 def trim(s: str) -> str: return s.strip()
@@ -51,6 +66,42 @@ def hex_to_rgb(hex_color: str) -> tuple:
         return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
     return COLOR_MAP['white']
 
+def index_zone(xy_key, z_level):
+    global populated_z_mask
+    bit = 1 << z_level
+    mask = z_index.get(xy_key, 0) | bit
+    z_index[xy_key] = mask
+    populated_z_mask |= bit
+    for mode in overlay_max:
+        value = overlay_value(mask, mode)
+        if value:
+            overlay_values[mode][xy_key] = value
+            overlay_max[mode] = max(overlay_max[mode], value)
+
+def step_z_level(z_level, direction):
+    # Nearest populated Z-level above (direction < 0) or below (direction > 0).
+    if direction > 0:
+        higher = populated_z_mask >> (z_level + 1)
+        if not higher: return z_level
+        return z_level + 1 + ((higher & -higher).bit_length() - 1)
+    lower = populated_z_mask & ((1 << z_level) - 1)
+    return lower.bit_length() - 1 if lower else z_level
+
+def overlay_shades(max_value):
+    # Ramp from OVERLAY_LOW_COLOR at 1 to OVERLAY_HIGH_COLOR at the largest value indexed.
+    if max_value not in overlay_shade_cache:
+        steps = max(1, max_value - 1)
+        overlay_shade_cache[max_value] = [None] + [
+            tuple(int(lo + (hi - lo) * i / steps) for lo, hi in zip(OVERLAY_LOW_COLOR, OVERLAY_HIGH_COLOR))
+            for i in range(max_value)]
+    return overlay_shade_cache[max_value]
+
+def overlay_value(mask, mode):
+    below = mask >> (SURFACE_Z + 1)
+    if not below: return 0
+    if mode == 'count': return bin(below).count('1')
+    return below.bit_length()
+
 def read_locations_from_cache_db():
     db_path = os.path.join(SAVE_DIR, "Synced\Saves", SAVE_UID, "cache.db")
     if not os.path.exists(db_path):
@@ -72,32 +123,49 @@ def read_locations_from_cache_db():
                     xy_key = ".".join(xy_parts)
                     z_level = int(z_part)
                     zones.setdefault(z_level, {}).setdefault(xy_key, {'color': 'cached'})
+                    index_zone(xy_key, z_level)
                 except ValueError: continue
         print(f"Loaded {len(rows)} historical locations from cache.\n")
     except sqlite3.Error as e:
         print(f"Error reading cache.db file: {e}")
 
 def read_player_log():
-    global current_location_str, current_z_level
+    global current_location_str, current_z_level, player_log_offset, player_log_tail, player_log_ino
     player_log_file = os.path.join(SAVE_DIR, "Player.log")
     if not os.path.exists(player_log_file): return
-    for z_data in zones.values():
-        for loc_data in z_data.values(): loc_data.pop('current', None)
     current_location = None
+    for z_level, z_data in zones.items():
+        for xy_key, loc_data in z_data.items():
+            if loc_data.pop('current', None):
+                loc_data['color'] = 'grey'
+                current_location = f"{xy_key}.{z_level}"
     log_pattern = re.compile(r"INFO - Finished '(?:Thawing|Building) JoppaWorld\.(\d+\.\d+\.\d+\.\d+\.\d+)'")
     try:
-        with open(player_log_file, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                match = log_pattern.search(line)
-                if match:
-                    zone_loc = match.group(1)
-                    try:
-                        *xy_parts, z_part = zone_loc.split('.')
-                        xy_key = ".".join(xy_parts)
-                        z_level = int(z_part)
-                        zones.setdefault(z_level, {}).setdefault(xy_key, {})['color'] = 'grey'
-                        current_location = zone_loc
-                    except ValueError: continue
+        # Only parse what was appended since the last read, so refreshes don't slow down as the log grows.
+        with open(player_log_file, 'rb') as f:
+            log_ino = os.fstat(f.fileno()).st_ino
+            f.seek(max(0, player_log_offset - len(player_log_tail)))
+            if log_ino != player_log_ino or f.read(len(player_log_tail)) != player_log_tail:
+                # Log was replaced or rewritten by a new session, even if it's already longer.
+                player_log_offset, player_log_tail, current_location = 0, b'', None
+                f.seek(0)
+            player_log_ino = log_ino
+            data = f.read()
+        data = data[:data.rfind(b'\n') + 1]  # Leave a partially written line for the next read
+        player_log_offset += len(data)
+        player_log_tail = (player_log_tail + data)[-LOG_TAIL_BYTES:]
+        for line in data.decode('utf-8', errors='ignore').splitlines():
+            match = log_pattern.search(line)
+            if match:
+                zone_loc = match.group(1)
+                try:
+                    *xy_parts, z_part = zone_loc.split('.')
+                    xy_key = ".".join(xy_parts)
+                    z_level = int(z_part)
+                    zones.setdefault(z_level, {}).setdefault(xy_key, {})['color'] = 'grey'
+                    index_zone(xy_key, z_level)
+                    current_location = zone_loc
+                except ValueError: continue
         if current_location:
             *xy_parts, z_part = current_location.split('.')
             xy_key = ".".join(xy_parts)
@@ -133,6 +201,7 @@ def add_locations_from_csv():
                         z_level = int(z_part)
                         print(f"Loading {name} {zone_loc}\n")
                         zones.setdefault(z_level, {})[xy_key] = {'name': name, 'color': color}
+                        index_zone(xy_key, z_level)
                     except ValueError: continue
     except IOError as e:
         print(f"Error reading locations CSV file: {e}")
@@ -148,8 +217,12 @@ def screen_to_world(screen_x, screen_y, zoom, camera_offset, map_area):
     world_y = (screen_y - map_area.top + camera_offset[1]) / zoom
     return world_x, world_y
 
-def draw_map(screen, zoom, camera_offset, map_area, z_level):
+def draw_map(screen, zoom, camera_offset, map_area, z_level, overlay_mode='off'):
     level_zones = zones.get(z_level, {})
+    # The overlay shades surface cells only; other levels draw normally.
+    show_overlay = overlay_mode != 'off' and z_level == SURFACE_Z
+    shades = overlay_shades(overlay_max[overlay_mode]) if show_overlay else None
+    values = overlay_values[overlay_mode] if show_overlay else {}
     effective_cell_size = BASE_CELL_SIZE * zoom
     world_tl_x, world_tl_y = screen_to_world(map_area.left, map_area.top, zoom, camera_offset, map_area)
     world_br_x, world_br_y = screen_to_world(map_area.right, map_area.bottom, zoom, camera_offset, map_area)
@@ -166,7 +239,10 @@ def draw_map(screen, zoom, camera_offset, map_area, z_level):
             zone_data = level_zones.get(xy_key, {})
             color_str = zone_data.get('color')
             final_color = GRID_BASE_COLOR
-            if color_str:
+            value = values.get(xy_key)
+            if value:
+                final_color = shades[value]
+            elif color_str:
                 final_color = hex_to_rgb(color_str) if color_str.startswith('#') else COLOR_MAP.get(color_str, GRID_BASE_COLOR)
             pygame.draw.rect(screen, final_color, rect)
             if zone_data.get('current'):
@@ -234,10 +310,18 @@ def draw_headers(screen, font, zoom, camera_offset, map_area):
             screen.blit(text, text.get_rect(center=(map_area.right + (SCREEN_WIDTH - map_area.right) / 2, screen_y)))
 
 # --- MODIFIED draw_hud function ---
-def draw_hud(screen, font, show_controls, follow_mode, show_names):
-    depth = current_z_level - 10
-    depth_str = "Surface" if depth == 0 else f"{depth} strata deep" if depth > 0 else f"{abs(depth)} strata high"
-    info_text = [ f"Current: {current_location_str}", f"Depth: {depth_str} (Z={current_z_level})", ]
+def depth_label(z_level):
+    depth = z_level - SURFACE_Z
+    return "Surface" if depth == 0 else f"{depth} strata deep" if depth > 0 else f"{abs(depth)} strata high"
+
+def draw_hud(screen, font, show_controls, follow_mode, show_names, view_z_level, overlay_mode):
+    info_text = [ f"Current: {current_location_str}", f"Depth: {depth_label(current_z_level)} (Z={current_z_level})", ]
+    if view_z_level != current_z_level:
+        info_text.append(f"Viewing: {depth_label(view_z_level)} (Z={view_z_level})")
+    if overlay_mode != 'off':
+        overlay_str = 'explored strata count' if overlay_mode == 'count' else 'deepest stratum'
+        overlay_str += " below surface" if view_z_level == SURFACE_Z else " (shown at surface only)"
+        info_text.append(f"Overlay: {overlay_str}")
     if show_controls:
         follow_status = "ON" if follow_mode else "OFF"
         names_status = "ON" if show_names else "OFF"
@@ -245,6 +329,8 @@ def draw_hud(screen, font, show_controls, follow_mode, show_names):
             " ", "Controls:", "  Mouse Wheel to Zoom", "  Middle-Click + Drag to Pan",
             f"  Follow Mode: {follow_status} (F)",
             f"  Show Names: {names_status} (N)",
+            f"  Underground Overlay: {overlay_mode.upper()} (O)",
+            "  PgUp/PgDn to step Z-level",
             "  'Q' to Quit", # <-- ADDED
         ])
     info_text.append(f"  Press 'H' to {'hide' if show_controls else 'show'} controls")
@@ -267,6 +353,7 @@ def main():
     zoom_level, camera_offset = 3.0, [0, 0]
     is_panning, pan_start_pos = False, (0, 0)
     show_controls_hud, follow_mode, show_names = True, True, True
+    overlay_mode, view_z_level = 'off', current_z_level
     name_font_cache = {}
 
     print("Loading initial location data...")
@@ -294,6 +381,13 @@ def main():
                     print(f"Follow mode {'enabled' if follow_mode else 'disabled'}.")
                 if event.key == pygame.K_n:
                     show_names = not show_names
+                if event.key == pygame.K_o:
+                    overlay_mode = OVERLAY_MODES[(OVERLAY_MODES.index(overlay_mode) + 1) % len(OVERLAY_MODES)]
+                if event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                    if follow_mode:
+                        follow_mode = False
+                        print("Follow mode disabled due to manual Z-level change.")
+                    view_z_level = step_z_level(view_z_level, 1 if event.key == pygame.K_PAGEDOWN else -1)
                 if event.key == pygame.K_q: # <-- ADDED
                     running = False
 
@@ -319,6 +413,8 @@ def main():
                 camera_offset[0] -= dx
                 camera_offset[1] -= dy
 
+        if follow_mode:
+            view_z_level = current_z_level
         if follow_mode and current_location_str != "None":
             try:
                 px, py, zx, zy, _ = map(int, current_location_str.split('.'))
@@ -332,12 +428,12 @@ def main():
 
         screen.fill(HEADER_BG_COLOR)
         screen.fill(GRID_BASE_COLOR, map_area)
-        draw_map(screen, zoom_level, camera_offset, map_area, current_z_level)
+        draw_map(screen, zoom_level, camera_offset, map_area, view_z_level, overlay_mode)
         draw_grid_lines(screen, zoom_level, camera_offset, map_area)
         if show_names:
-            draw_names(screen, zoom_level, camera_offset, map_area, current_z_level, name_font_cache)
+            draw_names(screen, zoom_level, camera_offset, map_area, view_z_level, name_font_cache)
         draw_headers(screen, header_font, zoom_level, camera_offset, map_area)
-        draw_hud(screen, font, show_controls_hud, follow_mode, show_names)
+        draw_hud(screen, font, show_controls_hud, follow_mode, show_names, view_z_level, overlay_mode)
         
         pygame.display.flip()
         clock.tick(60)
@@ -0,0 +1,373 @@
+"""
+Soak test for the live map viewers.
+
+Appends a synthetic (or recorded) Player.log into a temporary save directory at
+accelerated speed and drives qud_map.main() headlessly under SDL's dummy video
+driver, then the same read/regenerate path gen_map.main_loop() runs whenever the
+log changes. Each refresh stands in for one 5 second polling interval, so a
+multi-hour session runs in a few minutes.
+
+Before soaking, each viewer's incremental Player.log reader is checked against a
+partially written line, a truncated log and a restarted log that is already
+longer than the old one.
+
+RSS, refresh latency and frame time are sampled over the run, plus traced
+Python memory with --tracemalloc. Tracing is around 50 times slower on the
+gen_map path and inflates the timing samples, so pair it with a short --hours.
+The script exits non-zero if any metric trends upward beyond the configured
+limits, or if a driver stops early or collects too few samples to judge.
+
+Usage:
+    python soak_map.py --hours 4 --transitions 10
+    python soak_map.py --log path/to/Player.log --hours 0.25 --tracemalloc
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import importlib.util
+import tracemalloc
+import contextlib
+
+# Must be set before pygame is imported (qud_map imports it at module level).
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+# --- Configuration ---
+REFRESH_INTERVAL = 5  # Seconds of game time per refresh (qud_map timer / gen_map sleep)
+WARMUP_FRACTION = 0.1  # Leading share of samples ignored before comparing trends
+MIN_SAMPLES = 8  # Fewest samples left after warmup for a trend to be judged
+TIME_SLACK_MS = 2.0  # Absolute headroom so sub-millisecond jitter never fails a run
+LOG_LINE = "INFO - Finished '{verb} JoppaWorld.{zone}'\n"
+NOISE_LINES = [
+    "INFO - Starting 'Thawing JoppaWorld'\n",
+    "[Log] Garbage collection pass\n",
+    "UnityEngine.Debug:Log(Object)\n",
+]
+
+# --- Log Sources ---
+def synthetic_log(seed, box=6, z_min=10, z_max=16):
+    # Random walk confined to a box of parsangs, the way a player wanders around
+    # and keeps revisiting one region, so the set of zones saturates over time.
+    rng = random.Random(seed)
+    gx, gy, z = 0, 0, z_min
+    dim = box * 3
+    while True:
+        step = rng.randrange(10)
+        if step < 8:
+            dx, dy = rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+            gx, gy = (gx + dx) % dim, (gy + dy) % dim
+        else:
+            z = max(z_min, min(z_max, z + (1 if step == 8 else -1)))
+        px, zx = divmod(gx, 3)
+        py, zy = divmod(gy, 3)
+        if rng.random() < 0.3:
+            yield rng.choice(NOISE_LINES)
+        verb = "Thawing" if rng.random() < 0.6 else "Building"
+        yield LOG_LINE.format(verb=verb, zone=f"{px + 10}.{py + 5}.{zx}.{zy}.{z}")
+
+def load_recorded_log(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+    except OSError as e:
+        raise SystemExit(f"Error reading {path}: {e}")
+    if not any("Finished '" in line for line in lines):
+        raise SystemExit(f"No zone transitions found in {path}")
+    return lines
+
+def recorded_log(lines):
+    while True:
+        yield from lines
+
+class LogWriter:
+    def __init__(self, path, source, transitions):
+        self.path = path
+        self.source = source
+        self.transitions = transitions
+        open(path, 'w').close()
+
+    def append(self):
+        chunk, written = [], 0
+        while written < self.transitions:
+            line = next(self.source)
+            chunk.append(line)
+            if "Finished '" in line: written += 1
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(chunk)
+
+# --- Sampling ---
+def windows_rss_mb():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    get_current_process = ctypes.windll.kernel32.GetCurrentProcess
+    get_current_process.restype = wintypes.HANDLE
+    get_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+    get_memory_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    if not get_memory_info(get_current_process(), ctypes.byref(counters), counters.cb): return None
+    return counters.WorkingSetSize / 2**20
+
+def rss_mb():
+    # Current resident set size in MB, or None if this platform offers no way to read it.
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    if sys.platform == "win32":
+        try:
+            return windows_rss_mb()
+        except (OSError, AttributeError):
+            return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource  # Peak rather than current RSS, but still catches unbounded growth
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def new_samples(frames=False):
+    samples = {'refresh_ms': []}
+    if frames: samples['frame_ms'] = []
+    if rss_mb() is not None: samples['rss_mb'] = []
+    if tracemalloc.is_tracing(): samples['traced_mb'] = []
+    return samples
+
+def sample_memory(samples):
+    if 'traced_mb' in samples:
+        samples['traced_mb'].append(tracemalloc.get_traced_memory()[0] / 2**20)
+    if 'rss_mb' in samples:
+        samples['rss_mb'].append(rss_mb())
+
+# --- Log Reader Checks ---
+def load_fresh(name):
+    # A separate copy of the viewer module, so the check leaves the soaked one untouched.
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{name}.py")
+    spec = importlib.util.spec_from_file_location(f"{name}_log_check", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+LOG_READERS = {
+    'qud_map': (
+        lambda m: m.current_location_str,
+        lambda m, loc: loc.rsplit('.', 1)[0] in m.zones.get(int(loc.rsplit('.', 1)[1]), {})),
+    'gen_map': (
+        lambda m: next((loc for loc, data in m.zones.items() if data.get('current')), "None"),
+        lambda m, loc: loc in m.zones),
+}
+
+def check_log_reader(name):
+    current, visited = LOG_READERS[name]
+    module = load_fresh(name)
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="qud_soak_") as save_dir:
+        module.SAVE_DIR = save_dir
+        log_path = os.path.join(save_dir, "Player.log")
+
+        def step(label, mode, text, expected, also_visited=()):
+            with open(log_path, mode, encoding='utf-8') as f:
+                f.write(text)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                module.read_player_log()
+            got = current(module)
+            missing = [loc for loc in also_visited if not visited(module, loc)]
+            if got != expected or missing:
+                failures.append(f"{label}: current {got}, expected {expected}"
+                                + (f", missing {', '.join(missing)}" if missing else ""))
+
+        zone = lambda loc: LOG_LINE.format(verb="Building", zone=loc)
+        step("partial line", 'w', zone("1.1.0.0.10") + zone("1.1.0.1.11") + "INFO - Finished 'Building JoppaWorld.2.2",
+             "1.1.0.1.11")
+        step("completed line", 'a', ".0.0.10'\n", "2.2.0.0.10")
+        step("restarted log", 'w', zone("3.3.0.0.10") + NOISE_LINES[1] * 20 + zone("3.3.1.0.12"),
+             "3.3.1.0.12", also_visited=["3.3.0.0.10"])
+        step("truncated log", 'w', zone("4.4.0.0.10"), "4.4.0.0.10")
+    print(f"  {name:8} log reader  {'ok' if not failures else 'FAIL'}")
+    for failure in failures: print(f"    {failure}")
+    return [f"{name} log reader"] if failures else []
+
+# --- Drivers ---
+def soak_qud_map(args, save_dir, source):
+    import pygame
+    import qud_map
+
+    qud_map.SAVE_DIR = save_dir
+    writer = LogWriter(os.path.join(save_dir, "Player.log"), source, args.transitions)
+    samples = new_samples(frames=True)
+    update_event = pygame.USEREVENT + 1  # UPDATE_LOG_EVENT in qud_map.main()
+    state = {'frame_start': time.perf_counter(), 'refresh': 0.0, 'refreshes': 0, 'pending': False, 'quit': False}
+    input_cycle = [
+        lambda: pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=1, flipped=False),
+        lambda: pygame.event.Event(pygame.KEYDOWN, key=pygame.K_o, mod=0, unicode='o', scancode=0),
+        lambda: pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=-1, flipped=False),
+        lambda: pygame.event.Event(pygame.KEYDOWN, key=pygame.K_n, mod=0, unicode='n', scancode=0),
+    ]
+
+    real_read, real_flip, real_clock = qud_map.read_player_log, pygame.display.flip, pygame.time.Clock
+
+    def timed_read():
+        start = time.perf_counter()
+        real_read()
+        elapsed = time.perf_counter() - start
+        state['refresh'] += elapsed
+        # Only reads that follow an append count: not the startup read in qud_map.main(),
+        # nor the ones its own 5 second timer triggers with no new log data.
+        if not state['pending']: return
+        state['pending'] = False
+        state['refreshes'] += 1
+        samples['refresh_ms'].append(elapsed * 1000)
+        sample_memory(samples)
+
+    class SoakClock:
+        # Lifts the 60 FPS cap so the run is as fast as the viewer can draw.
+        def __init__(self):
+            self._clock = real_clock()
+
+        def tick(self, framerate=0):
+            result = self._clock.tick(0 if args.uncapped else framerate)
+            state['frame_start'], state['refresh'] = time.perf_counter(), 0.0
+            return result
+
+    def soak_flip():
+        real_flip()
+        samples['frame_ms'].append((time.perf_counter() - state['frame_start'] - state['refresh']) * 1000)
+        if state['refreshes'] >= args.refreshes:
+            state['quit'] = True
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return
+        if state['pending']: return  # Previous append not read yet
+        writer.append()
+        state['pending'] = True
+        pygame.event.post(pygame.event.Event(update_event))
+        if state['refreshes'] % args.input_every == 0:
+            pygame.event.post(input_cycle[state['refreshes'] // args.input_every % len(input_cycle)]())
+
+    qud_map.read_player_log = timed_read
+    pygame.display.flip = soak_flip
+    pygame.time.Clock = SoakClock
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            qud_map.main()
+    except SystemExit:
+        if not state['quit']: raise  # Only the exit that follows our QUIT is expected
+    finally:
+        qud_map.read_player_log = real_read
+        pygame.display.flip = real_flip
+        pygame.time.Clock = real_clock
+    zone_count = sum(len(level) for level in qud_map.zones.values())
+    print(f"qud_map: {state['refreshes']} refreshes, {len(samples['frame_ms'])} frames, "
+          f"{zone_count} zones across {len(qud_map.zones)} Z-levels")
+    return samples
+
+def soak_gen_map(args, save_dir, source):
+    import gen_map
+
+    gen_map.SAVE_DIR = save_dir
+    gen_map.HTML_FILE = os.path.join(save_dir, "parsang_map.html")
+    writer = LogWriter(os.path.join(save_dir, "Player.log"), source, args.transitions)
+    samples = new_samples()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        gen_map.add_locations_from_csv()
+        for _ in range(args.refreshes):
+            writer.append()
+            # Same steps gen_map.main_loop() takes when Player.log's mtime changes.
+            start = time.perf_counter()
+            gen_map.read_player_log()
+            gen_map.generate_html_output()
+            samples['refresh_ms'].append((time.perf_counter() - start) * 1000)
+            sample_memory(samples)
+    print(f"gen_map: {args.refreshes} refreshes, {len(gen_map.zones)} zones")
+    return samples
+
+# --- Trend Checks ---
+def window_medians(values):
+    values = values[int(len(values) * WARMUP_FRACTION):]
+    if len(values) < MIN_SAMPLES: return None
+    quarter = len(values) // 4
+    return statistics.median(values[:quarter]), statistics.median(values[-quarter:])
+
+def check_trends(name, samples, args):
+    failures = []
+    for metric, values in samples.items():
+        medians = window_medians(values)
+        if medians is None:
+            print(f"  {name:8} {metric:11} only {len(values)} samples, not checked  FAIL")
+            failures.append(f"{name} {metric} (too few samples)")
+            continue
+        first, last = medians
+        if metric.endswith('_ms'):
+            limit = first * args.max_time_growth + TIME_SLACK_MS
+            detail = f"{first:8.2f} -> {last:8.2f} ms (limit {limit:.2f})"
+        else:
+            limit = first + args.max_memory_growth
+            detail = f"{first:8.2f} -> {last:8.2f} MB (limit {limit:.2f})"
+        ok = last <= limit
+        print(f"  {name:8} {metric:11} {detail}  {'ok' if ok else 'FAIL'}")
+        if not ok: failures.append(f"{name} {metric}")
+    return failures
+
+# --- Main ---
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test the live map viewers against an accelerated Player.log.")
+    parser.add_argument("--hours", type=float, default=4.0, help="Simulated session length (default: 4)")
+    parser.add_argument("--transitions", type=int, default=10, help="Zone transitions appended per refresh (default: 10)")
+    parser.add_argument("--log", help="Recorded Player.log to replay instead of the synthetic walk")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the synthetic walk")
+    parser.add_argument("--input-every", type=int, default=7, help="Refreshes between simulated zoom/overlay/name inputs")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also sample traced Python memory (up to ~50x slower)")
+    parser.add_argument("--capped", dest="uncapped", action="store_false", help="Keep qud_map's 60 FPS frame cap")
+    parser.add_argument("--max-time-growth", type=float, default=1.5, help="Allowed late/early ratio for latency and frame time")
+    parser.add_argument("--max-memory-growth", type=float, default=16.0, help="Allowed late-early growth in MB for traced and RSS memory")
+    parser.add_argument("--skip", choices=["qud_map", "gen_map"], action="append", default=[], help="Skip one of the drivers")
+    args = parser.parse_args(argv)
+    args.refreshes = max(1, int(args.hours * 3600 / REFRESH_INTERVAL))
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    drivers = [(name, driver) for name, driver in (("qud_map", soak_qud_map), ("gen_map", soak_gen_map)) if name not in args.skip]
+    print(f"Simulating {args.hours}h: {args.refreshes} refreshes x {args.transitions} transitions")
+    recorded = load_recorded_log(args.log) if args.log else None
+    failures = []
+    for name, _ in drivers:
+        failures.extend(check_log_reader(name))
+    if rss_mb() is None: print("RSS is not readable on this platform; skipping rss_mb.")
+    if args.tracemalloc: tracemalloc.start()
+    for name, driver in drivers:
+        source = recorded_log(recorded) if recorded else synthetic_log(args.seed)
+        with tempfile.TemporaryDirectory(prefix="qud_soak_") as save_dir:
+            started = time.perf_counter()
+            samples = driver(args, save_dir, source)
+            print(f"  finished in {time.perf_counter() - started:.1f}s")
+        if len(samples['refresh_ms']) < args.refreshes:
+            print(f"  {name:8} stopped after {len(samples['refresh_ms'])} of {args.refreshes} refreshes  FAIL")
+            failures.append(f"{name} incomplete run")
+        failures.extend(check_trends(name, samples, args))
+    if args.tracemalloc: tracemalloc.stop()
+    if failures:
+        print(f"Soak test FAILED: {', '.join(failures)}")
+        return 1
+    print("Soak test passed.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())